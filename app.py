@@ -1,16 +1,140 @@
-from flask import Flask, render_template, jsonify, request, flash, redirect, url_for
-import json
+from flask import Flask, render_template, jsonify, request, flash, redirect, url_for, Response, stream_with_context, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
+import orjson
+import atexit
+import math
 import os
+import queue
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
 from datetime import datetime
 import logging
 
+import numpy as np
+
+try:
+    from rtree import index as rtree_index
+except ImportError:  # libspatialindex not available, fall back to a linear scan
+    rtree_index = None
+
+try:
+    import ijson
+except ImportError:  # stream-free fallback: parse the whole file into the cache
+    ijson = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+    # Statistics may carry NumPy scalars and non-string dict keys
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of via str
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.option)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config.from_pyfile('config.py')
 app.secret_key = app.config['SECRET_KEY']
+Compress(app)
+
+# Layers served by the application and their files, in load order
+GEOJSON_FILES = {
+    'households': 'Cagpile_Households.geojson',
+    'facilities': 'Cagpile_Facilities.geojson',
+    'roads': 'Cagpile_Road.geojson',
+    'boundary': 'Cagpile_Boundary.geojson'
+}
+
+def geometry_bbox(geometry):
+    """Return (minx, miny, maxx, maxy) of a GeoJSON geometry, or None if it is empty"""
+    if not geometry:
+        return None
+    
+    if geometry.get('type') == 'GeometryCollection':
+        stack = [g.get('coordinates') for g in geometry.get('geometries', [])]
+    else:
+        stack = [geometry.get('coordinates')]
+    
+    xs, ys = [], []
+    while stack:
+        coords = stack.pop()
+        if not coords:
+            continue
+        if isinstance(coords[0], (int, float)):
+            xs.append(coords[0])
+            ys.append(coords[1])
+        else:
+            stack.extend(coords)
+    
+    return (min(xs), min(ys), max(xs), max(ys)) if xs else None
+
+def parse_int(value, default=0, limit=None):
+    """Convert a number or integer string property to int, otherwise return default"""
+    try:
+        number = int(value)
+    except (ValueError, TypeError, OverflowError):
+        return default
+    # Values beyond +/-limit are treated as invalid rather than overflowing a column
+    if limit is not None and abs(number) > limit:
+        return default
+    return number
+
+def normalize_household_properties(props):
+    """Store purok under 'purok' and senior/PWD as exactly 'YES' or 'NO'"""
+    if 'Purok' in props and 'purok' not in props:
+        props['purok'] = props.pop('Purok')
+    senior_pwd = props.get('senior/PWD')
+    props['senior/PWD'] = 'YES' if isinstance(senior_pwd, str) and senior_pwd.strip().upper() == 'YES' else 'NO'
+    return props
+
+# Bounds for HouseholdsSoA columns; residents stay small enough that summing
+# millions of them cannot overflow int64
+ID_LIMIT = np.iinfo(np.int64).max
+RESIDENTS_LIMIT = np.iinfo(np.int32).max
+
+@dataclass
+class HouseholdsSoA:
+    """Household properties laid out as parallel NumPy columns"""
+    ids: np.ndarray  # int64, -1 where the id is not numeric
+    residents: np.ndarray  # int64, 0 where the count is not a sane integer
+    senior_pwd: np.ndarray  # bool
+    purok: np.ndarray  # int16 codes into purok_categories, -1 when unset
+    purok_categories: list
+
+    @classmethod
+    def from_features(cls, features):
+        # Expects properties already passed through normalize_household_properties
+        props = [f.get('properties', {}) for f in features]
+        categories = {}
+        purok_codes = []
+        for p in props:
+            purok = p.get('purok')
+            purok_codes.append(categories.setdefault(str(purok), len(categories)) if purok else -1)
+        
+        return cls(
+            ids=np.array([parse_int(p.get('id'), -1, ID_LIMIT) for p in props], dtype=np.int64),
+            residents=np.array([parse_int(p.get('Residents'), 0, RESIDENTS_LIMIT) for p in props], dtype=np.int64),
+            senior_pwd=np.array(
+                [p.get('senior/PWD') == 'YES' for p in props], dtype=np.bool_
+            ),
+            purok=np.array(purok_codes, dtype=np.int16),
+            purok_categories=list(categories)
+        )
 
 class DataManager:
     def __init__(self):
@@ -18,151 +142,563 @@ class DataManager:
         # Ensure data directory exists
         os.makedirs(self.data_dir, exist_ok=True)
         logger.info(f"Data directory: {self.data_dir}")
-        
-    def load_geojson_data(self):
-        """Load all GeoJSON data files"""
-        data = {}
-        geojson_files = {
-            'households': 'Cagpile_Households.geojson',
-            'facilities': 'Cagpile_Facilities.geojson',
-            'roads': 'Cagpile_Road.geojson',
-            'boundary': 'Cagpile_Boundary.geojson'
+        self._file_paths = {
+            layer: os.path.join(self.data_dir, filename)
+            for layer, filename in GEOJSON_FILES.items()
+        }
+        # Parsed GeoJSON keyed by file path, validated against st_mtime_ns.
+        # Each entry holds {'mtime': int, 'data': dict, 'index': dict[str, int],
+        # 'max_id': int}
+        # plus a 'spatial' index built on the first bbox query and, for
+        # households, 'soa' columns built on the first statistics call
+        self._cache: dict[str, dict] = {}
+        self._lock = threading.RLock()
+        # Files whose cached edits are not on disk yet, written by a single
+        # background thread fed through _write_q
+        self._pending: set[str] = set()
+        self._write_q = queue.Queue()
+        # Bumped on every save so a finished write can tell whether newer
+        # edits arrived while it was on disk
+        self._versions: dict[str, int] = {}
+        # Serialises file writes without holding _lock during disk I/O
+        self._write_lock = threading.Lock()
+        # Last statistics result, keyed by the households/facilities mtimes
+        self._stats_cache: tuple[tuple, dict] | None = None
+        # Data directory listing, keyed by the directory's mtime
+        self._listing_cache: tuple[int, list] | None = None
+        threading.Thread(target=self._writer_loop, name='geojson-writer', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _build_index(self, features):
+        """Map each feature id (as a string) to its position in the features list"""
+        return {
+            str(f['properties'].get('id')): i
+            for i, f in enumerate(features)
+            if f['properties'].get('id') is not None
         }
+
+    def _compute_max_id(self, features):
+        """Return the largest numeric feature id, or 0 if there is none"""
+        return max((parse_int(f['properties'].get('id')) for f in features), default=0)
+
+    def _get_max_id(self, layer_name):
+        """Return the largest numeric id of a loaded layer (0 if it has no file yet)"""
+        entry = self._cache.get(self._get_file_path(layer_name))
+        return entry['max_id'] if entry else 0
+
+    def _record_added(self, layer_name, start, features):
+        """Index features appended at position start and advance the layer's max id"""
+        entry = self._cache.get(self._get_file_path(layer_name))
+        if not entry:
+            # Nothing cached yet; saving builds the index and max id from scratch
+            return
         
-        for key, filename in geojson_files.items():
-            file_path = os.path.join(self.data_dir, filename)
-            logger.info(f"Looking for {filename} at: {file_path}")
+        for position, feature in enumerate(features, start):
+            feature_id = feature['properties'].get('id')
+            if feature_id is not None:
+                entry['index'][str(feature_id)] = position
+                entry['max_id'] = max(entry['max_id'], parse_int(feature_id))
+
+    def _reindex_feature(self, layer_name, old_id, new_id):
+        """Move a feature's index slot to a new id; returns an error message or None"""
+        entry = self._cache.get(self._get_file_path(layer_name))
+        if str(new_id) in entry['index']:
+            return f"Feature {new_id} already exists in {layer_name}"
+        
+        entry['index'][str(new_id)] = entry['index'].pop(str(old_id))
+        entry['max_id'] = max(entry['max_id'], parse_int(new_id))
+        return None
+
+    def _normalize_features(self, layer_name, features):
+        """Canonicalise household properties once so readers need no fallbacks"""
+        if layer_name != 'households':
+            return
+        for feature in features:
+            normalize_household_properties(feature['properties'])
+
+    def _get_index(self, layer_name):
+        """Return the id index of a loaded layer (empty if it has no file yet)"""
+        entry = self._cache.get(self._get_file_path(layer_name))
+        return entry['index'] if entry else {}
+
+    def _get_file_path(self, layer_name):
+        """Resolve the GeoJSON file path for a layer"""
+        file_path = self._file_paths.get(layer_name)
+        if file_path is None:
+            file_path = os.path.join(self.data_dir, f'Cagpile_{layer_name.capitalize()}.geojson')
+        return file_path
+        
+    def _get_cached(self, file_path):
+        """Return the cached copy of a file if it is still current, else None"""
+        with self._lock:
+            cached = self._cache.get(file_path)
+            if not cached:
+                return None
+            if file_path in self._pending:
+                # Edits have not been written yet, the cache is the newest copy
+                return cached['data']
             
             try:
+                mtime = os.stat(file_path).st_mtime_ns
+            except OSError:
+                return None
+            return cached['data'] if cached['mtime'] == mtime else None
+
+    def load_layer(self, layer_name, strict=False):
+        """Load a single GeoJSON layer, re-parsing only when its file changed"""
+        if layer_name not in GEOJSON_FILES:
+            return None
+        
+        file_path = self._get_file_path(layer_name)
+        filename = os.path.basename(file_path)
+        logger.info(f"Looking for {filename} at: {file_path}")
+        
+        try:
+            with self._lock:
+                cached = self._get_cached(file_path)
+                if cached is not None:
+                    return cached
+                
                 if os.path.exists(file_path):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data[key] = json.load(f)
-                    logger.info(f"✅ Loaded {len(data[key]['features'])} features from {filename}")
-                else:
-                    data[key] = {'type': 'FeatureCollection', 'features': []}
-                    logger.warning(f"⚠️ File not found: {file_path}")
-            except Exception as e:
-                logger.error(f"❌ Error loading {filename}: {str(e)}")
-                data[key] = {'type': 'FeatureCollection', 'features': []}
+                    st = os.stat(file_path)
+                    with open(file_path, 'rb') as f:
+                        layer_data = orjson.loads(f.read())
+                    self._normalize_features(layer_name, layer_data['features'])
+                    self._cache[file_path] = {
+                        'mtime': st.st_mtime_ns,
+                        'data': layer_data,
+                        'index': self._build_index(layer_data['features']),
+                        'max_id': self._compute_max_id(layer_data['features'])
+                    }
+                    logger.info(f"✅ Loaded {len(layer_data['features'])} features from {filename}")
+                    return layer_data
+            logger.warning(f"⚠️ File not found: {file_path}")
+        except Exception as e:
+            logger.error(f"❌ Error loading {filename}: {str(e)}")
+            # Writers must not mistake an unreadable file for an empty layer
+            # and save over it
+            if strict:
+                raise
         
-        return data
+        return {'type': 'FeatureCollection', 'features': []}
+
+    def load_geojson_data(self):
+        """Load all GeoJSON data files"""
+        return {key: self.load_layer(key) for key in GEOJSON_FILES}
+
+    def count_features(self, layer_name):
+        """Count a layer's features, streaming the file if it is not cached"""
+        file_path = self._get_file_path(layer_name)
+        cached = self._get_cached(file_path)
+        if cached is not None or ijson is None:
+            return len((cached or self.load_layer(layer_name))['features'])
+        
+        try:
+            with open(file_path, 'rb') as f:
+                return sum(1 for _ in ijson.items(f, 'features.item'))
+        except FileNotFoundError:
+            return 0
+        except ijson.JSONError as e:
+            logger.error(f"❌ Error loading {os.path.basename(file_path)}: {str(e)}")
+            return 0
+
+    def list_properties(self, layer_name):
+        """List each feature's properties without keeping an uncached layer in memory"""
+        file_path = self._get_file_path(layer_name)
+        cached = self._get_cached(file_path)
+        if cached is not None or ijson is None:
+            return [
+                feature.get('properties', {})
+                for feature in (cached or self.load_layer(layer_name))['features']
+            ]
+        
+        try:
+            with open(file_path, 'rb') as f:
+                properties = list(ijson.items(f, 'features.item.properties', use_float=True))
+        except FileNotFoundError:
+            return []
+        except ijson.JSONError as e:
+            # Like load_layer, an unreadable file counts as an empty layer
+            logger.error(f"❌ Error loading {os.path.basename(file_path)}: {str(e)}")
+            return []
+        
+        if layer_name == 'households':
+            for props in properties:
+                normalize_household_properties(props)
+        return properties
 
     def save_geojson_data(self, data, layer_name):
-        """Save GeoJSON data to file"""
+        """Save GeoJSON data, batching rapid edits into a single file write"""
         try:
-            # Map layer names to correct file names
-            file_mapping = {
-                'households': 'Cagpile_Households.geojson',
-                'facilities': 'Cagpile_Facilities.geojson',
-                'roads': 'Cagpile_Road.geojson',
-                'boundary': 'Cagpile_Boundary.geojson'
-            }
+            file_path = self._get_file_path(layer_name)
             
-            filename = file_mapping.get(layer_name, f'Cagpile_{layer_name.capitalize()}.geojson')
-            file_path = os.path.join(self.data_dir, filename)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with self._lock:
+                # Keep the cache in step with what is being saved. CRUD
+                # methods maintain the index and max id of the cached layer
+                # themselves; anything else saved here gets fresh ones.
+                cached = self._cache.get(file_path)
+                if cached and cached['data'] is data:
+                    index, max_id = cached['index'], cached['max_id']
+                else:
+                    self._normalize_features(layer_name, data['features'])
+                    index = self._build_index(data['features'])
+                    max_id = self._compute_max_id(data['features'])
+                self._cache[file_path] = {
+                    'mtime': cached['mtime'] if cached else None,
+                    'data': data,
+                    'index': index,
+                    'max_id': max_id
+                }
+                self._stats_cache = None
+                self._versions[file_path] = self._versions.get(file_path, 0) + 1
+                
+                if app.config.get('GEOJSON_WRITE_DELAY', 0) > 0:
+                    self._pending.add(file_path)
+                    self._write_q.put(file_path)
+                    return True, "Data queued for saving"
+                else:
+                    try:
+                        # Inline writes happen under _lock; with the background
+                        # writer off nothing else takes _write_lock first
+                        with self._write_lock:
+                            self._write_file(file_path)
+                    except Exception:
+                        # The caller is told the save failed, so fall back to
+                        # what is actually on disk
+                        self._cache.pop(file_path, None)
+                        raise
             
-            logger.info(f"✅ Saved {len(data['features'])} features to {filename}")
             return True, "Data saved successfully"
         except Exception as e:
             logger.error(f"❌ Error saving {layer_name}: {str(e)}")
             return False, str(e)
 
+    def _write_file(self, file_path):
+        """Atomically write the cached copy of a layer to disk (caller holds _write_lock)"""
+        option = orjson.OPT_INDENT_2 if app.config.get('GEOJSON_PRETTY') else 0
+        # Snapshot under the lock, then leave readers free during the disk I/O
+        with self._lock:
+            version = self._versions.get(file_path)
+            data = self._cache[file_path]['data']
+            payload = orjson.dumps(data, option=option)
+            count = len(data['features'])
+        tmp_path = file_path + '.tmp'
+        
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+                # Get the bytes onto disk before the rename makes them the layer,
+                # so a crash cannot leave an empty or truncated file behind
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+        except Exception:
+            # Leave the cache and pending state alone; the caller decides
+            # whether to retry or fall back to the file on disk
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        
+        with self._lock:
+            # A save queued meanwhile keeps the file pending for its own write
+            if self._versions.get(file_path) == version:
+                self._pending.discard(file_path)
+                self._cache[file_path]['mtime'] = os.stat(file_path).st_mtime_ns
+        logger.info(f"✅ Saved {count} features to {os.path.basename(file_path)}")
+
+    def _flush_file(self, file_path):
+        """Write a pending layer to disk; returns False if the write failed"""
+        # Check first so nothing waits on _write_lock when there is no work
+        with self._lock:
+            if file_path not in self._pending:
+                return True
+        
+        with self._write_lock:
+            with self._lock:
+                if file_path not in self._pending:
+                    return True
+            try:
+                self._write_file(file_path)
+            except Exception as e:
+                # The edits stay cached and pending so they can be retried
+                logger.error(f"❌ Error saving {os.path.basename(file_path)}, will retry: {str(e)}")
+                return False
+            return True
+
+    def _writer_loop(self):
+        """Write queued layers in the background, coalescing bursts of edits"""
+        while True:
+            batch = {self._write_q.get()}
+            # Let rapid successive edits pile up; the cache always holds the
+            # latest state, so each file is written once per batch
+            time.sleep(app.config.get('GEOJSON_WRITE_DELAY', 0))
+            while True:
+                try:
+                    batch.add(self._write_q.get_nowait())
+                except queue.Empty:
+                    break
+            
+            failed = [file_path for file_path in batch if not self._flush_file(file_path)]
+            if failed:
+                time.sleep(app.config.get('GEOJSON_RETRY_DELAY', 5))
+                for file_path in failed:
+                    self._write_q.put(file_path)
+
+    def flush(self, layer_name=None):
+        """Write pending layers (or just one) to disk immediately"""
+        if layer_name:
+            self._flush_file(self._get_file_path(layer_name))
+            return
+        with self._lock:
+            pending = list(self._pending)
+        for file_path in pending:
+            self._flush_file(file_path)
+
     def update_feature(self, layer_name, feature_id, new_properties, new_geometry=None):
         """Update a specific feature"""
-        try:
-            geojson_data = self.load_geojson_data()
-            layer_data = geojson_data.get(layer_name)
+        with self._lock:
+            try:
+                layer_data = self.load_layer(layer_name, strict=True)
             
-            if not layer_data:
-                return False, f"Layer {layer_name} not found"
+                if not layer_data:
+                    return False, f"Layer {layer_name} not found"
             
-            # Find and update the feature
-            for feature in layer_data['features']:
-                if str(feature['properties'].get('id')) == str(feature_id):
-                    # Update properties
-                    feature['properties'].update(new_properties)
-                    
-                    # Update geometry if provided
-                    if new_geometry:
-                        feature['geometry'] = new_geometry
-                    
-                    # Save the changes
-                    success, message = self.save_geojson_data(layer_data, layer_name)
-                    return success, message
+                # Find and update the feature
+                position = self._get_index(layer_name).get(str(feature_id))
+                if position is None:
+                    return False, f"Feature {feature_id} not found in {layer_name}"
             
-            return False, f"Feature {feature_id} not found in {layer_name}"
-        except Exception as e:
-            return False, str(e)
+                feature = layer_data['features'][position]
+                
+                # Keep the index pointing at the feature if its id changes
+                if 'id' in new_properties and str(new_properties['id']) != str(feature_id):
+                    error = self._reindex_feature(layer_name, feature_id, new_properties['id'])
+                    if error:
+                        return False, error
+                
+                # Update properties
+                feature['properties'].update(new_properties)
+                self._normalize_features(layer_name, [feature])
+            
+                # Update geometry if provided
+                if new_geometry:
+                    feature['geometry'] = new_geometry
+            
+                # Save the changes
+                success, message = self.save_geojson_data(layer_data, layer_name)
+                return success, message
+            except Exception as e:
+                return False, str(e)
 
     def delete_feature(self, layer_name, feature_id):
         """Delete a specific feature"""
-        try:
-            geojson_data = self.load_geojson_data()
-            layer_data = geojson_data.get(layer_name)
+        with self._lock:
+            try:
+                layer_data = self.load_layer(layer_name, strict=True)
             
-            if not layer_data:
-                return False, f"Layer {layer_name} not found"
+                if not layer_data:
+                    return False, f"Layer {layer_name} not found"
             
-            # Filter out the feature to delete
-            original_count = len(layer_data['features'])
-            layer_data['features'] = [
-                feature for feature in layer_data['features']
-                if str(feature['properties'].get('id')) != str(feature_id)
-            ]
+                # Remove the feature to delete
+                index = self._get_index(layer_name)
+                position = index.pop(str(feature_id), None)
+                if position is None:
+                    return False, f"Feature {feature_id} not found in {layer_name}"
             
-            if len(layer_data['features']) == original_count:
-                return False, f"Feature {feature_id} not found in {layer_name}"
+                del layer_data['features'][position]
+                # Features after the removed one moved down a slot
+                for key, value in index.items():
+                    if value > position:
+                        index[key] = value - 1
             
-            # Save the changes
-            success, message = self.save_geojson_data(layer_data, layer_name)
-            return success, message
-        except Exception as e:
-            return False, str(e)
+                # Save the changes
+                success, message = self.save_geojson_data(layer_data, layer_name)
+                return success, message
+            except Exception as e:
+                return False, str(e)
 
     def add_feature(self, layer_name, properties, geometry):
         """Add a new feature to the GeoJSON file"""
+        with self._lock:
+            try:
+                layer_data = self.load_layer(layer_name, strict=True)
+            
+                if not layer_data:
+                    return False, f"Layer {layer_name} not found"
+            
+                # Generate ID if not provided
+                if 'id' not in properties:
+                    properties['id'] = self._get_max_id(layer_name) + 1
+                elif str(properties['id']) in self._get_index(layer_name):
+                    return False, f"Feature {properties['id']} already exists in {layer_name}"
+            
+                # Create new feature
+                new_feature = {
+                    'type': 'Feature',
+                    'properties': properties,
+                    'geometry': geometry
+                }
+            
+                # Add to features list
+                self._normalize_features(layer_name, [new_feature])
+                layer_data['features'].append(new_feature)
+                self._record_added(layer_name, len(layer_data['features']) - 1, [new_feature])
+            
+                # Save the changes
+                success, message = self.save_geojson_data(layer_data, layer_name)
+                return success, message
+            
+            except Exception as e:
+                return False, str(e)
+
+    def add_features(self, layer_name, features):
+        """Add several features to the GeoJSON file with a single save"""
+        with self._lock:
+            try:
+                layer_data = self.load_layer(layer_name, strict=True)
+            
+                if not layer_data:
+                    return False, f"Layer {layer_name} not found"
+            
+                # Refuse ids that are taken, in the layer or within the batch
+                index = self._get_index(layer_name)
+                new_ids = [
+                    str(f['properties']['id']) for f in features
+                    if f['properties'].get('id') is not None
+                ]
+                counts = Counter(new_ids)
+                duplicates = sorted({i for i in new_ids if i in index or counts[i] > 1})
+                if duplicates:
+                    return False, f"Feature IDs already exist in {layer_name}: {', '.join(duplicates)}"
+            
+                # Add to features list and index the new positions
+                start = len(layer_data['features'])
+                self._normalize_features(layer_name, features)
+                layer_data['features'].extend(features)
+                self._record_added(layer_name, start, features)
+            
+                # Save the changes
+                success, message = self.save_geojson_data(layer_data, layer_name)
+                return success, message
+            
+            except Exception as e:
+                return False, str(e)
+
+    def list_data_files(self):
+        """List the data directory, re-reading it only when its mtime changes"""
         try:
-            geojson_data = self.load_geojson_data()
-            layer_data = geojson_data.get(layer_name)
+            mtime = os.stat(self.data_dir).st_mtime_ns
+        except OSError:
+            return []
+        
+        with self._lock:
+            if not self._listing_cache or self._listing_cache[0] != mtime:
+                self._listing_cache = (mtime, os.listdir(self.data_dir))
+            return list(self._listing_cache[1])
+
+    def get_next_id(self, layer_name):
+        """Return the id the next feature added to a layer will receive"""
+        with self._lock:
+            self.load_layer(layer_name)
+            return self._get_max_id(layer_name) + 1
+
+    def get_layer_path(self, layer_name):
+        """Return the path of the GeoJSON file backing a layer"""
+        return self._get_file_path(layer_name)
+
+    def get_feature(self, layer_name, feature_id):
+        """Look up a single feature by id, or None if it does not exist"""
+        with self._lock:
+            layer_data = self.load_layer(layer_name)
+            if not layer_data:
+                return None
             
+            position = self._get_index(layer_name).get(str(feature_id))
+            return layer_data['features'][position] if position is not None else None
+
+    def _build_spatial_index(self, features):
+        """Build a bbox index over feature positions (R-tree when available)"""
+        bboxes = [(i, geometry_bbox(f.get('geometry'))) for i, f in enumerate(features)]
+        bboxes = [(i, bbox) for i, bbox in bboxes if bbox]
+        
+        if rtree_index is None:
+            return bboxes
+        if not bboxes:
+            return rtree_index.Index()
+        return rtree_index.Index((i, bbox, None) for i, bbox in bboxes)
+
+    def query_bbox(self, layer_name, bbox):
+        """Return the features of a layer whose bounds intersect bbox (minx, miny, maxx, maxy)"""
+        with self._lock:
+            layer_data = self.load_layer(layer_name)
             if not layer_data:
-                return False, f"Layer {layer_name} not found"
-            
-            # Generate ID if not provided
-            if 'id' not in properties:
-                existing_ids = [
-                    f['properties'].get('id', 0) 
-                    for f in layer_data['features'] 
-                    if f['properties'].get('id')
-                ]
-                new_id = max(existing_ids) + 1 if existing_ids else 1
-                properties['id'] = new_id
-            
-            # Create new feature
-            new_feature = {
-                'type': 'Feature',
-                'properties': properties,
-                'geometry': geometry
-            }
+                return None
             
-            # Add to features list
-            layer_data['features'].append(new_feature)
+            entry = self._cache.get(self._get_file_path(layer_name))
+            if not entry:
+                return []
+            # Saving a layer replaces its cache entry, which drops this index
+            if entry.get('spatial') is None:
+                entry['spatial'] = self._build_spatial_index(layer_data['features'])
+            spatial = entry['spatial']
             
-            # Save the changes
-            success, message = self.save_geojson_data(layer_data, layer_name)
-            return success, message
+            if rtree_index is None:
+                minx, miny, maxx, maxy = bbox
+                positions = [
+                    i for i, (fminx, fminy, fmaxx, fmaxy) in spatial
+                    if fminx <= maxx and fmaxx >= minx and fminy <= maxy and fmaxy >= miny
+                ]
+            else:
+                positions = sorted(spatial.intersection(bbox))
             
-        except Exception as e:
-            return False, str(e)
+            return [layer_data['features'][i] for i in positions]
+
+    def _get_households_soa(self, households_data):
+        """Return column arrays for households, reusing the cached ones when possible"""
+        with self._lock:
+            entry = self._cache.get(self._get_file_path('households'))
+            if not entry or entry['data'] is not households_data:
+                # Caller-supplied data may still use 'Purok' or loose senior/PWD
+                # values; normalise copies so their features stay untouched
+                return HouseholdsSoA.from_features([
+                    {'properties': normalize_household_properties(dict(f.get('properties') or {}))}
+                    for f in households_data['features']
+                ])
+            # Saving the layer replaces its cache entry, which drops these
+            if entry.get('soa') is None:
+                entry['soa'] = HouseholdsSoA.from_features(households_data['features'])
+            return entry['soa']
 
     def get_statistics(self, geojson_data=None):
         """Calculate comprehensive statistics from GeoJSON data"""
-        if geojson_data is None:
-            geojson_data = self.load_geojson_data()
+        if geojson_data is not None:
+            return self._calculate_statistics(geojson_data)
         
+        # Reuse the last result while neither source file has changed
+        key = tuple(self._get_mtime(layer) for layer in ('households', 'facilities'))
+        with self._lock:
+            if self._stats_cache and self._stats_cache[0] == key:
+                return dict(self._stats_cache[1])
+            
+            # Only households and facilities feed the statistics
+            stats = self._calculate_statistics({
+                'households': self.load_layer('households'),
+                'facilities': self.load_layer('facilities')
+            })
+            self._stats_cache = (key, stats)
+            return dict(stats)
+
+    def _get_mtime(self, layer_name):
+        """Return the st_mtime_ns of a layer's file, or None if it is missing"""
+        try:
+            return os.stat(self._get_file_path(layer_name)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _calculate_statistics(self, geojson_data):
+        """Compute the statistics for the given households and facilities"""
         stats = {
             'total_households': 0,
             'total_residents': 0,
@@ -177,37 +713,27 @@ class DataManager:
         try:
             # Count households and residents
             households_data = geojson_data.get('households', {'features': []})
-            stats['total_households'] = len(households_data['features'])
+            soa = self._get_households_soa(households_data)
+            stats['total_households'] = len(soa.ids)
+            stats['total_residents'] = int(soa.residents.sum())
             
-            for feature in households_data['features']:
-                props = feature.get('properties', {})
-                
-                # Count residents
-                residents = props.get('Residents')
-                if residents is not None:
-                    try:
-                        stats['total_residents'] += int(residents)
-                    except (ValueError, TypeError):
-                        pass
-                
-                # Count vulnerable households
-                senior_pwd = props.get('senior/PWD')
-                if senior_pwd and str(senior_pwd).upper() == 'YES':
-                    stats['vulnerable_households'] += 1
-                
-                # Count purok distribution
-                purok = props.get('purok') or props.get('Purok')
-                if purok:
-                    stats['purok_distribution'][str(purok)] = stats['purok_distribution'].get(str(purok), 0) + 1
+            # Count vulnerable households
+            stats['vulnerable_households'] = int(soa.senior_pwd.sum())
+            
+            # Count purok distribution
+            codes, counts = np.unique(soa.purok[soa.purok >= 0], return_counts=True)
+            stats['purok_distribution'] = {
+                soa.purok_categories[code]: count
+                for code, count in zip(codes.tolist(), counts.tolist())
+            }
             
             # Count facilities
             facilities_data = geojson_data.get('facilities', {'features': []})
             stats['total_facilities'] = len(facilities_data['features'])
-            
-            for feature in facilities_data['features']:
-                props = feature.get('properties', {})
-                facility_type = props.get('Facility', 'Unknown')
-                stats['facility_types'][facility_type] = stats['facility_types'].get(facility_type, 0) + 1
+            stats['facility_types'] = dict(Counter(
+                f.get('properties', {}).get('Facility', 'Unknown')
+                for f in facilities_data['features']
+            ))
             
             # Estimate households with seniors/PWD (since we only have combined field)
             stats['households_with_seniors'] = stats['vulnerable_households']
@@ -240,8 +766,7 @@ def map_editor():
 @app.route('/dashboard')
 def dashboard():
     """Data dashboard with comprehensive statistics"""
-    geojson_data = data_manager.load_geojson_data()
-    stats = data_manager.get_statistics(geojson_data)
+    stats = data_manager.get_statistics()
     
     # Add some sample data for demonstration (remove in production)
     if stats['total_households'] == 0:
@@ -260,19 +785,17 @@ def dashboard():
 @app.route('/household-data')
 def household_data():
     """Household data table view"""
-    geojson_data = data_manager.load_geojson_data()
-    households = []
-    
-    for feature in geojson_data['households']['features']:
-        props = feature.get('properties', {})
-        households.append({
+    households = [
+        {
             'household_id': props.get('id', 'N/A'),
             'head_of_household': props.get('Owner', 'N/A'),
             'num_residents': props.get('Residents', 0),
             'has_seniors_pwd': 'Yes' if props.get('senior/PWD') == 'YES' else 'No',
             'contact': props.get('Contact no', 'N/A'),
             'family_name': props.get('Family nm', 'N/A')
-        })
+        }
+        for props in data_manager.list_properties('households')
+    ]
     
     # Sort by household ID
     households.sort(key=lambda x: x['household_id'])
@@ -341,10 +864,8 @@ def add_household():
         except Exception as e:
             flash(f'Error processing form: {str(e)}', 'error')
     
-    # Load current households for ID generation
-    geojson_data = data_manager.load_geojson_data()
-    
-    return render_template('add_household.html', households=geojson_data['households']['features'])
+    # Suggest the next free household ID
+    return render_template('add_household.html', next_id=data_manager.get_next_id('households'))
 
 @app.route('/edit-household/<household_id>', methods=['GET', 'POST'])
 def edit_household(household_id):
@@ -391,16 +912,14 @@ def edit_household(household_id):
             flash(f'Error processing form: {str(e)}', 'error')
     
     # Load actual household data
-    geojson_data = data_manager.load_geojson_data()
+    feature = data_manager.get_feature('households', household_id)
     household = None
     
-    for feature in geojson_data['households']['features']:
-        if str(feature['properties'].get('id')) == str(household_id):
-            household = {
-                'properties': feature['properties'],
-                'geometry': feature['geometry']
-            }
-            break
+    if feature:
+        household = {
+            'properties': feature['properties'],
+            'geometry': feature['geometry']
+        }
     
     if not household:
         flash('Household not found', 'error')
@@ -449,8 +968,84 @@ def bulk_upload():
             return redirect(request.url)
         
         if file and file.filename.endswith('.csv'):
-            flash('Bulk upload completed successfully! (Demo feature)', 'success')
-            return redirect(url_for('household_data'))
+            # Only this route needs pandas, so keep it off the startup path
+            import pandas as pd
+            
+            try:
+                # Read everything as text so IDs and contact numbers keep their zeros
+                df = pd.read_csv(file.stream, dtype=str, keep_default_na=False)
+                df.columns = df.columns.str.strip()
+                
+                required = ['household_id', 'head_of_household', 'latitude', 'longitude']
+                missing = [column for column in required if column not in df.columns]
+                if missing:
+                    flash(f'Missing required columns: {", ".join(missing)}', 'error')
+                    return redirect(request.url)
+                
+                if df.empty:
+                    flash('The CSV file has no household rows', 'error')
+                    return redirect(request.url)
+                
+                df = df.apply(lambda column: column.str.strip())
+                if (df[required] == '').any(axis=None):
+                    flash('Every row needs a household ID, head of household and coordinates', 'error')
+                    return redirect(request.url)
+                
+                def optional(column, default=''):
+                    return df[column] if column in df.columns else pd.Series(default, index=df.index)
+                
+                ids = df['household_id'].str.removeprefix('CPL-').astype(int)
+                repeated = sorted(set(ids[ids.duplicated()].tolist()))
+                if repeated:
+                    flash(f'Household IDs appear more than once: {", ".join(f"CPL-{i}" for i in repeated)}', 'error')
+                    return redirect(request.url)
+                # IDs already in the layer are refused by add_features under its lock
+                residents = optional('num_residents', '1').replace('', '1').astype(int)
+                senior_pwd = np.where(optional('has_seniors_pwd').str.upper() == 'YES', 'YES', 'NO')
+                longitudes = df['longitude'].astype(float)
+                latitudes = df['latitude'].astype(float)
+                if not (np.isfinite(longitudes).all() and np.isfinite(latitudes).all()
+                        and longitudes.abs().le(180).all() and latitudes.abs().le(90).all()):
+                    flash('Coordinates must be finite, with latitude within ±90 and longitude within ±180', 'error')
+                    return redirect(request.url)
+                
+                new_features = [
+                    {
+                        'type': 'Feature',
+                        'properties': {
+                            'id': household_id,
+                            'Owner': owner,
+                            'Residents': num_residents,
+                            'senior/PWD': vulnerable,
+                            'Family nm': family_name,
+                            'Contact no': contact,
+                            **({'purok': purok} if purok else {})
+                        },
+                        'geometry': {
+                            'type': 'Point',
+                            'coordinates': [longitude, latitude]
+                        }
+                    }
+                    for household_id, owner, num_residents, vulnerable, family_name, contact, purok, longitude, latitude
+                    in zip(ids.tolist(), df['head_of_household'], residents.tolist(), senior_pwd.tolist(),
+                           optional('family_name'), optional('contact'), optional('purok'),
+                           longitudes.tolist(), latitudes.tolist())
+                ]
+                
+                success, message = data_manager.add_features('households', new_features)
+                
+                if success:
+                    flash(f'{len(new_features)} households uploaded successfully!', 'success')
+                    return redirect(url_for('household_data'))
+                else:
+                    flash(f'Error saving households: {message}', 'error')
+                    
+            except pd.errors.EmptyDataError:
+                flash('The CSV file has no household rows', 'error')
+            except ValueError as e:
+                flash('Please check that IDs, resident counts and coordinates are valid numbers', 'error')
+            except Exception as e:
+                flash(f'Error processing CSV file: {str(e)}', 'error')
         else:
             flash('Please upload a CSV file', 'error')
     
@@ -517,18 +1112,7 @@ def api_add_feature():
         properties = data.get('properties', {})
         geometry = data.get('geometry')
         
-        # Generate new ID if not provided
-        if 'id' not in properties:
-            geojson_data = data_manager.load_geojson_data()
-            existing_features = geojson_data.get(layer_name, {}).get('features', [])
-            existing_ids = [
-                int(f['properties'].get('id', 0)) 
-                for f in existing_features 
-                if f['properties'].get('id') and str(f['properties'].get('id')).isdigit()
-            ]
-            new_id = max(existing_ids) + 1 if existing_ids else 1
-            properties['id'] = new_id
-        
+        # add_feature assigns the next free ID when none is provided
         success, message = data_manager.add_feature(layer_name, properties, geometry)
         
         if success:
@@ -543,15 +1127,14 @@ def api_add_feature():
 def api_get_feature(layer_name, feature_id):
     """API endpoint to get a specific feature"""
     try:
-        geojson_data = data_manager.load_geojson_data()
-        layer_data = geojson_data.get(layer_name)
+        layer_data = data_manager.load_layer(layer_name)
         
         if not layer_data:
             return jsonify({'success': False, 'message': f'Layer {layer_name} not found'}), 404
         
-        for feature in layer_data['features']:
-            if str(feature['properties'].get('id')) == str(feature_id):
-                return jsonify({'success': True, 'feature': feature})
+        feature = data_manager.get_feature(layer_name, feature_id)
+        if feature:
+            return jsonify({'success': True, 'feature': feature})
         
         return jsonify({'success': False, 'message': 'Feature not found'}), 404
         
@@ -559,49 +1142,99 @@ def api_get_feature(layer_name, feature_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 # ===== DATA API ROUTES =====
+def stream_featurecollection(fc):
+    """Yield a FeatureCollection as JSON one feature at a time"""
+    # Snapshot the list so edits made while streaming don't shift it
+    features = list(fc.get('features', []))
+    head = {key: value for key, value in fc.items() if key != 'features'}
+    
+    yield orjson.dumps(head)[:-1] + (b',"features":[' if head else b'"features":[')
+    for i, feature in enumerate(features):
+        yield (b',' if i else b'') + orjson.dumps(feature)
+    yield b']}'
+
+def featurecollection_response(fc):
+    """Stream a FeatureCollection back to the client as JSON"""
+    return Response(stream_with_context(stream_featurecollection(fc)), mimetype='application/json')
+
+def layer_file_response(layer_name):
+    """Serve a layer's GeoJSON file as-is, answering conditional GETs with 304"""
+    # Make sure edits still queued for the background writer are on disk
+    data_manager.flush(layer_name)
+    file_path = data_manager.get_layer_path(layer_name)
+    
+    if not os.path.exists(file_path):
+        return featurecollection_response(data_manager.load_layer(layer_name))
+    
+    response = send_from_directory(
+        os.path.dirname(file_path),
+        os.path.basename(file_path),
+        mimetype='application/json',
+        conditional=True
+    )
+    # Browsers must revalidate against the ETag on every request so an edit
+    # shows up immediately; unchanged layers still come back as 304
+    response.headers['Cache-Control'] = 'no-cache'
+    # Buffer the file so Flask-Compress can apply gzip and keep Content-Length;
+    # it does not gzip streamed bodies
+    response.direct_passthrough = False
+    response.make_sequence()
+    return response
+
 @app.route('/api/households')
 def get_households():
     """API endpoint for households GeoJSON"""
-    geojson_data = data_manager.load_geojson_data()
-    return jsonify(geojson_data['households'])
+    return layer_file_response('households')
 
 @app.route('/api/facilities')
 def get_facilities():
     """API endpoint for facilities GeoJSON"""
-    geojson_data = data_manager.load_geojson_data()
-    return jsonify(geojson_data['facilities'])
+    return layer_file_response('facilities')
 
 @app.route('/api/roads')
 def get_roads():
     """API endpoint for roads GeoJSON"""
-    geojson_data = data_manager.load_geojson_data()
-    return jsonify(geojson_data['roads'])
+    return layer_file_response('roads')
 
 @app.route('/api/boundary')
 def get_boundary():
     """API endpoint for boundary GeoJSON"""
-    geojson_data = data_manager.load_geojson_data()
-    return jsonify(geojson_data['boundary'])
+    return layer_file_response('boundary')
+
+@app.route('/api/<layer_name>/bbox')
+def get_layer_bbox(layer_name):
+    """API endpoint for the features of a layer inside a bounding box"""
+    try:
+        bbox = tuple(float(request.args[key]) for key in ('minx', 'miny', 'maxx', 'maxy'))
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'message': 'minx, miny, maxx and maxy are required numbers'}), 400
+    
+    minx, miny, maxx, maxy = bbox
+    if not all(math.isfinite(value) for value in bbox) or minx > maxx or miny > maxy:
+        return jsonify({'success': False, 'message': 'Bounding box must be finite with minx <= maxx and miny <= maxy'}), 400
+    
+    features = data_manager.query_bbox(layer_name, bbox)
+    if features is None:
+        return jsonify({'success': False, 'message': f'Layer {layer_name} not found'}), 404
+    
+    return featurecollection_response({'type': 'FeatureCollection', 'features': features})
 
 @app.route('/api/statistics')
 def get_statistics():
     """API endpoint for statistics"""
-    geojson_data = data_manager.load_geojson_data()
-    stats = data_manager.get_statistics(geojson_data)
+    stats = data_manager.get_statistics()
     return jsonify(stats)
 
 @app.route('/api/debug-data')
 def debug_data():
     """Debug endpoint to check what data is being loaded"""
-    geojson_data = data_manager.load_geojson_data()
-    
     debug_info = {
-        'households_count': len(geojson_data['households']['features']),
-        'facilities_count': len(geojson_data['facilities']['features']),
-        'roads_count': len(geojson_data['roads']['features']),
-        'boundary_count': len(geojson_data['boundary']['features']),
+        'households_count': data_manager.count_features('households'),
+        'facilities_count': data_manager.count_features('facilities'),
+        'roads_count': data_manager.count_features('roads'),
+        'boundary_count': data_manager.count_features('boundary'),
         'data_directory': app.config['DATA_DIR'],
-        'files_in_directory': os.listdir(app.config['DATA_DIR']) if os.path.exists(app.config['DATA_DIR']) else []
+        'files_in_directory': data_manager.list_data_files()
     }
     
     return jsonify(debug_info)
@@ -616,17 +1249,17 @@ def internal_error(error):
     return render_template('500.html'), 500
 
 # ===== REQUEST HANDLERS =====
-@app.before_request
-def before_request():
-    """Set up before each request"""
-    pass
+SECURITY_HEADERS = (
+    ('X-Content-Type-Options', 'nosniff'),
+    ('X-Frame-Options', 'DENY'),
+    ('X-XSS-Protection', '1; mode=block')
+)
 
 @app.after_request
 def after_request(response):
     """Set up after each request"""
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'DENY'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
+    # No route sets these itself, so append them in one call
+    response.headers.extend(SECURITY_HEADERS)
     return response
 
 # ===== APPLICATION STARTUP =====
@@ -636,14 +1269,11 @@ if __name__ == '__main__':
     print(f"🌐 Access the application at: http://{app.config['HOST']}:{app.config['PORT']}")
     print("🎯 Advanced GIS Editor: http://localhost:5000/map-editor")
     
-    # Check if data files exist and load them
-    data_manager = DataManager()
-    geojson_data = data_manager.load_geojson_data()
-    
-    print(f"🏠 Loaded {len(geojson_data['households']['features'])} households")
-    print(f"🏢 Loaded {len(geojson_data['facilities']['features'])} facilities")
-    print(f"🛣️ Loaded {len(geojson_data['roads']['features'])} roads")
-    print(f"🗺️ Loaded {len(geojson_data['boundary']['features'])} boundary features")
+    # Check if data files exist; layers are parsed on first use
+    print(f"🏠 Found {data_manager.count_features('households')} households")
+    print(f"🏢 Found {data_manager.count_features('facilities')} facilities")
+    print(f"🛣️ Found {data_manager.count_features('roads')} roads")
+    print(f"🗺️ Found {data_manager.count_features('boundary')} boundary features")
     
     app.run(debug=app.config['DEBUG'], 
             host=app.config['HOST'], 
@@ -10,10 +10,23 @@ DEBUG = True
 # Server settings
 HOST = '0.0.0.0'
 PORT = 5000
+THREADS = 8  # Worker threads for the production (waitress) server
 
 # File paths
 DATA_DIR = os.path.join(BASE_DIR, 'static', 'data', 'geojson')
 
+# GeoJSON storage settings
+GEOJSON_PRETTY = False  # Indent saved files (larger and slower to re-read)
+GEOJSON_WRITE_DELAY = 0.2  # Seconds the background writer batches edits for; 0 writes inline
+GEOJSON_RETRY_DELAY = 5  # Seconds before a failed background write is retried
+
+# Response compression (Flask-Compress)
+COMPRESS_MIMETYPES = ['application/json', 'application/geo+json', 'text/csv']
+COMPRESS_LEVEL = 6
+COMPRESS_MIN_SIZE = 1024
+# Streamed bbox responses; Flask-Compress leaves gzip out of this list by default
+COMPRESS_ALGORITHM_STREAMING = ['zstd', 'br', 'gzip', 'deflate']
+
 # Map configuration
 MAP_CONFIG = {
     'default_center': [12.2392, 125.3185],  # Barangay Cagpile coordinates
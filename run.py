@@ -3,19 +3,34 @@
 Barangay Cagpile Information Mapping System
 Run script for the Flask application
 """
+import os
+
 from app import app
 
 if __name__ == '__main__':
+    development = os.environ.get('FLASK_ENV') == 'development'
+    
     print("=" * 60)
     print("🏠 BARANGAY CAGPILE INFORMATION MAPPING SYSTEM")
     print("=" * 60)
     print(f"📍 Barangay Cagpile, Oras, Eastern Samar")
     print(f"🌐 Server: http://{app.config['HOST']}:{app.config['PORT']}")
-    print(f"🔧 Debug Mode: {app.config['DEBUG']}")
+    print(f"🔧 Debug Mode: {app.config['DEBUG'] and development}")
     print("=" * 60)
     
-    app.run(
-        debug=app.config['DEBUG'],
-        host=app.config['HOST'],
-        port=app.config['PORT']
-    )
\ No newline at end of file
+    if development:
+        app.run(
+            debug=app.config['DEBUG'],
+            host=app.config['HOST'],
+            port=app.config['PORT']
+        )
+    else:
+        # Multi-threaded server in a single process, so every request shares
+        # the same GeoJSON cache and background writer
+        from waitress import serve
+        serve(
+            app,
+            host=app.config['HOST'],
+            port=app.config['PORT'],
+            threads=app.config['THREADS']
+        )